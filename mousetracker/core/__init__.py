@@ -1,6 +1,7 @@
 from mousetracker.core.analysis import *
 from mousetracker.core._version import *
 from mousetracker.core.base import *
+from mousetracker.core.cache import *
 from mousetracker.core.eyes import *
 from mousetracker.core.whiskers import *
 from mousetracker.core.yaml_config import *
@@ -49,6 +49,7 @@ class RecordingSessionData(object):
         self.rootdir = path.split(self.videos[0].name)[0] if len(self.videos) > 0 else None
         self.summaryfigure = path.join(self.rootdir, "summary_plots.pdf") if self.rootdir else None
         self.summarystats = path.join(self.rootdir, "summary_data.csv") if self.rootdir else None
+        self.summarydataset = path.join(self.rootdir, "summary_data.parquet") if self.rootdir else None
 
 
 modulePath = path.dirname(path.abspath(__file__))
@@ -0,0 +1,68 @@
+"""
+Content-addressed reuse of whisker toolchain outputs.
+
+Tracing dominates runtime, so toolchain outputs are cached under a hash of the
+source video's bytes.  A copied or renamed video reuses prior results, and
+leftover files from a run on a *different* video can never be picked up by name.
+"""
+import hashlib
+import mmap
+import shutil
+from logging import info
+from os import makedirs, path
+
+# cached toolchain outputs live here, shared across runs and input locations.
+cache_root = path.join(path.expanduser('~'), '.mousetracker', 'cache')
+
+
+def cache_key(filename: str) -> str:
+    """
+    Compute a digest of a file's contents.
+    :param filename: the file to hash.
+    :return: a hex digest suitable for use as a cache entry stem.
+    """
+    with open(filename, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as contents:
+            return hashlib.blake2b(contents, digest_size=16).hexdigest()
+
+
+def parameter_suffix(suffix: str, *params) -> str:
+    """
+    Qualify a cache suffix with the analysis parameters an output depends on, so
+    entries computed under different configurations never collide.
+    :param suffix: which output this is (e.g. ".measurements").
+    :param params: the config values baked into that output.
+    :return: a suffix carrying a digest of the parameters.
+    """
+    digest = hashlib.blake2b('\0'.join(str(p) for p in params).encode(), digest_size=8).hexdigest()
+    return '-' + digest + suffix
+
+
+def fetch(key: str, suffix: str, destination: str) -> bool:
+    """
+    Copy a cached toolchain output next to the video being processed, if one exists.
+    :param key: the digest of the source video.
+    :param suffix: which output to look for (e.g. ".whiskers").
+    :param destination: where the pipeline expects the file.
+    :return: True if a cached copy was restored.
+    """
+    cached = path.join(cache_root, key + suffix)
+    if path.isfile(cached):
+        info(f'restored cached {suffix} output for {path.basename(destination)}')
+        shutil.copyfile(cached, destination)
+        return True
+    return False
+
+
+def store(key: str, suffix: str, source: str) -> None:
+    """
+    Save a freshly computed toolchain output into the cache.
+    :param key: the digest of the source video.
+    :param suffix: which output this is (e.g. ".whiskers").
+    :param source: the file the toolchain just wrote.
+    :return:
+    """
+    if not path.isfile(source):
+        return
+    makedirs(cache_root, exist_ok=True)
+    shutil.copyfile(source, path.join(cache_root, key + suffix))
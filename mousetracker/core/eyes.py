@@ -95,6 +95,29 @@ def compute_areas(frame) -> EyeStats:
     return _contour_to_ellipse(closing)
 
 
+def compute_areas_batch(frames: List[np.ndarray]) -> List[EyeStats]:
+    """
+    Compute eye statistics for a batch of equally sized frames in one pass over the pixel data.
+    The HSV conversion and red mask are pixel-wise, so they run once over the vertically
+    stacked batch; thresholding and contour fitting stay per-frame, because Otsu's
+    threshold and the contours are frame-local.
+    :param frames: a list of extracted video frames, all the same size.
+    :return: One measurement result per frame, in order.
+    """
+    if not frames:
+        return []
+    frame_height = frames[0].shape[0]
+    stack_hsv = cv2.cvtColor(np.concatenate(frames, axis=0), cv2.COLOR_BGR2HSV)
+    stack_grey = _red_mask(frame_hsv=stack_hsv)
+    results = []
+    for i in range(len(frames)):
+        output_grey = stack_grey[i * frame_height:(i + 1) * frame_height]
+        thresh1 = _threshold_frame(output_grey)
+        closing = _morph_and_smooth(thresh1)
+        results.append(_contour_to_ellipse(closing))
+    return results
+
+
 def _contour_to_ellipse(opened):
     """
     Find the ellipse which most closely fits the largest contour in the frame.
@@ -0,0 +1,43 @@
+"""
+Persistent job runner for the python2.7 whisker loader scripts.
+
+Reads tab-separated job lines on stdin -- the loader script path followed by its
+arguments -- runs each in-process via runpy, and answers with one OK or ERR line
+on stdout per job.  mousetracker starts this once per run so interpreter startup
+and the loaders' imports are paid once instead of once per checkpoint.
+
+Must stay python2.7-compatible: it runs under the interpreter named by the
+system.python27_path config value.
+"""
+import runpy
+import sys
+import traceback
+
+
+def main():
+    # only protocol lines may reach the real stdout; anything the loaders print
+    # goes to stderr so it cannot desync the control channel.
+    control = sys.stdout
+    for line in iter(sys.stdin.readline, ''):
+        parts = line.rstrip('\n').split('\t')
+        if parts == ['']:
+            continue
+        sys.argv = parts
+        sys.stdout = sys.stderr
+        try:
+            runpy.run_path(parts[0], run_name='__main__')
+        except SystemExit as e:
+            code = 0 if e.code in (None, 0) else e.code
+            status = 'OK' if code == 0 else 'ERR exit %s' % code
+        except Exception:
+            status = 'ERR %s' % traceback.format_exc().splitlines()[-1]
+        else:
+            status = 'OK'
+        finally:
+            sys.stdout = control
+        control.write(status + '\n')
+        control.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1 @@
-from . import signal_processing
+from . import fast_csv, signal_processing, video
@@ -0,0 +1,56 @@
+"""
+Video writing via a piped ffmpeg process.
+"""
+import shutil
+import subprocess
+from typing import Tuple
+
+import numpy as np
+
+
+class FFmpegVideoWriter:
+    """
+    Drop-in replacement for cv2.VideoWriter that pipes raw frames to an ffmpeg
+    process over stdin.  ffmpeg's encoders are much faster than the MPEG writer
+    built into OpenCV, and encoding happens in a separate process so it overlaps
+    with the python side producing frames.
+    """
+
+    def __init__(self, filename: str, fps: int, frame_size: Tuple[int, int], is_color: bool = True):
+        """
+        Open the output file and start the encoder.
+        :param filename: the video file to write.
+        :param fps: the frame rate to stamp on the output.
+        :param frame_size: the (width, height) of every frame that will be written.
+        :param is_color: whether frames are BGR (True) or single-channel grey (False).
+        """
+        command = [shutil.which('ffmpeg'), '-y',
+                   '-f', 'rawvideo',
+                   '-pix_fmt', 'bgr24' if is_color else 'gray',
+                   '-s', f'{frame_size[0]}x{frame_size[1]}',
+                   '-r', str(fps),
+                   '-i', '-',
+                   '-an',
+                   '-codec:v', 'mpeg4',
+                   '-qscale:v', '2',
+                   filename]
+        self._proc = subprocess.Popen(command, stdin=subprocess.PIPE,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                      bufsize=10 ** 7, close_fds=False)
+
+    def write(self, frame: np.ndarray) -> None:
+        """
+        Encode one frame.
+        :param frame: a frame of the size and colorness declared at construction.
+        :return:
+        """
+        self._proc.stdin.write(frame.tobytes())
+
+    def release(self) -> None:
+        """
+        Flush the pipe and wait for the encoder to finish the container.
+        :return:
+        """
+        self._proc.stdin.close()
+        if self._proc.wait() != 0:
+            raise IOError('ffmpeg exited with an error while encoding')
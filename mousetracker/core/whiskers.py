@@ -1,15 +1,63 @@
+import asyncio
 import subprocess
+import threading
 from collections import namedtuple
+from functools import lru_cache
 from logging import info
 
 import pandas as pd
 import shutil
+from mousetracker.core import cache
 from mousetracker.core.base import *
+from mousetracker.core.util.fast_csv import read_csv
 from mousetracker.core.util.signal_processing import lowpass
 from mousetracker.core.yaml_config import Config
 
 timedata = namedtuple("timedata", "frameid,mean_degrees,num_whiskers,stderr")
 
+@lru_cache(maxsize=None)
+def _tool_path(name: str) -> str:
+    """
+    Locate a whisk toolchain executable once per process instead of once per stage per video.
+    :param name: the executable to find.
+    :return: its absolute path, or None if it is not on the system path.
+    """
+    return shutil.which(name)
+
+
+# one persistent python2.7 job runner per interpreter path; see _run_loader.
+_py27_workers = {}
+_py27_lock = threading.Lock()
+
+
+def _run_loader(config, loader: str, input_file: str, output_file: str, label: str) -> None:
+    """
+    Run one of the python2.7 loader scripts through a persistent interpreter.
+    The first call starts python2.7 on the job-runner driver shipped in core/resources;
+    later calls feed jobs to it over stdin, so interpreter startup and the loaders'
+    imports are paid once per run instead of once per checkpoint.
+    :param config:
+    :param loader: the loader script to run.
+    :param input_file: the whiskers or measurements file to load.
+    :param output_file: where the loader should write its CSV.
+    :param label: a human-readable name for error messages.
+    :return:
+    """
+    with _py27_lock:
+        worker = _py27_workers.get(config.system.python27_path)
+        if worker is None or worker.poll() is not None:
+            driver = path.join(modulePath, 'resources', 'py27_job_runner.py')
+            worker = subprocess.Popen([config.system.python27_path, '-u', driver],
+                                      stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                      stderr=subprocess.DEVNULL, close_fds=False)
+            _py27_workers[config.system.python27_path] = worker
+        job = '\t'.join([loader, '--input', input_file, '-o', output_file])
+        worker.stdin.write((job + '\n').encode())
+        worker.stdin.flush()
+        status = worker.stdout.readline().decode().strip()
+    if status != 'OK':
+        raise IOError(f"failed to extract from {label}: {status or 'loader worker died'}")
+
 
 def estimate_whisking_from_measurements(video: VideoFileData, config, keep_files):
     """
@@ -21,17 +69,12 @@ def estimate_whisking_from_measurements(video: VideoFileData, config, keep_files
     """
     checkpoint = video.whiskraw
     if not (path.isfile(checkpoint) and keep_files):
-        call = [config.system.python27_path, config.system.load_measurements_path, '--input', video.whiskname, '-o',
-                checkpoint]
         info(f'extracting whisker movement from {video.labelname}')
-        data = subprocess.run(call, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        if data.returncode == 0:
-            data = pd.read_csv(checkpoint)
-        else:
-            raise IOError(f"failed to extract from {video.labelname}: {repr(data.stderr)}")
+        _run_loader(config, config.system.load_measurements_path, video.whiskname, checkpoint, video.labelname)
+        data = read_csv(checkpoint)
     else:
         info(f"found existing whisker data for {video.labelname}")
-        data = pd.read_csv(checkpoint)
+        data = read_csv(checkpoint)
 
 def estimate_whisking_from_raw_whiskers(video: VideoFileData, config, keep_files):
     """
@@ -43,94 +86,91 @@ def estimate_whisking_from_raw_whiskers(video: VideoFileData, config, keep_files
     """
     checkpoint = video.whiskraw
     if not (path.isfile(checkpoint) and keep_files):
-        call = [config.system.python27_path, config.system.load_whiskers_path, '--input', video.whiskname, '-o', checkpoint]
         info(f'extracting whisker movement from {video.labelname}')
-        data = subprocess.run(call, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        if data.returncode == 0:
-            data = pd.read_csv(checkpoint)
-        else:
-            raise IOError(f"failed to extract from {video.labelname}: {repr(data.stderr)}")
+        _run_loader(config, config.system.load_whiskers_path, video.whiskname, checkpoint, video.labelname)
+        data = read_csv(checkpoint)
     else:
         info(f"found existing whisker data for {video.labelname}")
-        data = pd.read_csv(checkpoint)
+        data = read_csv(checkpoint)
 
     side = filter_raw(data, config, video.labelname)
     # rename columns to match side of face.
     side.columns = (side.columns[0], *[video.side.name+'_'+x for x in side.columns[1:]])
-    side.to_csv(video.whiskcheck)
+    # index by frameid up front: the checkpoint then carries frameid as its index column
+    # instead of a throwaway range index, and the eye join needs it anyway.
     side = side.set_index('frameid')
+    side.to_csv(video.whiskcheck)
     joined = side.join(video.eye)
     joined.to_csv(video.summaryfile)
 
 
-def extract_whisk_data(video: VideoFileData, config, keep_files):
+async def _run(call) -> subprocess.CompletedProcess:
+    """
+    Run one toolchain executable without blocking the event loop.
+    :param call: the executable path and its arguments.
+    :return: a CompletedProcess mirroring what subprocess.run would have returned.
+    """
+    proc = await asyncio.create_subprocess_exec(*call, stdout=asyncio.subprocess.PIPE,
+                                                stderr=asyncio.subprocess.PIPE, close_fds=False)
+    stdout, stderr = await proc.communicate()
+    return subprocess.CompletedProcess(args=call, returncode=proc.returncode, stdout=stdout, stderr=stderr)
+
+
+async def extract_whisk_data(video: VideoFileData, config, keep_files):
     """
     Run the whisk code toolchain on a video file.  generate a whiskers and measurements file.
+    Each stage awaits its subprocess, so pipelines for many videos can overlap on one event loop.
     :param video:
     :param config:
     :param keep_files:
     :return:
     """
-    trace_path = shutil.which('trace')
-    trace_args = [video.name, video.whiskname]
-    measure_path = shutil.which('measure')
-    measure_args = ['--face', video.side.name, video.whiskname, video.measname]
-    classify_path = shutil.which('classify')
-    classify_args = [video.measname, video.measname, video.side.name, '--px2mm', str(config.camera.px2mm),
-                     '-n', str(config.animal.num_whiskers)]
-    reclassify_path = shutil.which('reclassify.exe')
-    reclassify_args = [video.measname, video.measname, '-n', '-1']
-    if not (keep_files and path.exists(video.whiskname)):
-        info(f'tracing whiskers for {video.labelname}')
-        istraced = subprocess.run([trace_path, *trace_args], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    else:
-        info(f'found existing whiskers file for {video.labelname}')
-        istraced = subprocess.CompletedProcess(args=[], returncode=0)  # fake a completed run.
-    if istraced.returncode == 0:
-        info(f"trace OK for {video.labelname}")
-        if not (keep_files and path.exists(video.measname)):
-            info(f'measuring whiskers for {video.labelname}')
-            ismeasured = subprocess.run([measure_path, *measure_args], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        else:
-            info(f'found existing measurements file for {video.labelname}')
-            ismeasured = subprocess.CompletedProcess(args=[], returncode=0)  # fake a completed run.
-
-        if ismeasured.returncode == 0:
-            info(f"measure OK for {video.labelname}")
-            if not (keep_files and path.exists(video.measname)):
-                info(f'classifying whiskers for {video.labelname}')
-                isclassified = subprocess.run([classify_path, *classify_args], stdout=subprocess.PIPE,
-                                              stderr=subprocess.PIPE)
-            else:
-                info(f'found existing measurements file for {video.labelname}')
-                isclassified = subprocess.CompletedProcess(args=[], returncode=0)  # fake a completed run.
-
-            if isclassified.returncode == 0:
-                info(f"classification OK for {video.labelname}")
-                if not (keep_files and path.exists(video.measname)):
-                    info(f'reclassifying whiskers for {video.labelname}')
-                    isreclassified = subprocess.run([reclassify_path, *reclassify_args], stdout=subprocess.PIPE,
-                                                    stderr=subprocess.PIPE)
-                else:
-                    info(f'found existing measurements file for {video.labelname}')
-                    isreclassified = subprocess.CompletedProcess(args=[], returncode=0)  # fake a completed run.
-
-                if isreclassified.returncode == 0:
-                    info(f"reclassification OK for {video.labelname}")
-                    info(f"whiskers complete for {video.labelname}")
-                    if not path.isfile(video.whiskname) or not path.isfile(video.measname):
-                        raise IOError(f"whisker or measurement file was not saved for {video.name}")
-                    if not (path.isfile(video.summaryfile) and keep_files):
-                        estimate_whisking_from_raw_whiskers(video, config, keep_files)
-                        # return video
-                else:
-                    raise IOError(f"reclassifier failed on {video.labelname}")
-            else:
-                raise IOError(f"classifier failed on {video.labelname}")
-        else:
-            raise IOError(f"measurement failed on {video.labelname}")
-    else:
-        raise IOError(f"trace failed on {video.labelname}")
+    # each stage: name, executable, arguments, and the output whose existence lets us skip it.
+    stages = (('trace', _tool_path('trace'),
+               [video.name, video.whiskname], video.whiskname),
+              ('measure', _tool_path('measure'),
+               ['--face', video.side.name, video.whiskname, video.measname], video.measname),
+              ('classify', _tool_path('classify'),
+               [video.measname, video.measname, video.side.name, '--px2mm', str(config.camera.px2mm),
+                '-n', str(config.animal.num_whiskers)], video.measname),
+              ('reclassify', _tool_path('reclassify.exe'),
+               [video.measname, video.measname, '-n', '-1'], video.measname))
+    # key reuse on the video's contents, not its name, so copied or renamed inputs hit the cache too.
+    key = cache.cache_key(video.name) if keep_files else None
+    # measurements bake in the classify parameters, so their cache entry must too;
+    # whiskers and the raw CSV derive from the video alone.
+    meas_entry = cache.parameter_suffix('.measurements', config.camera.px2mm, config.animal.num_whiskers)
+    if key and not path.exists(video.whiskname):
+        cache.fetch(key, '.whiskers', video.whiskname)
+    if key and not path.exists(video.measname):
+        cache.fetch(key, meas_entry, video.measname)
+    if key and not path.exists(video.whiskraw):
+        cache.fetch(key, '-whisk-raw.csv', video.whiskraw)
+    ran = set()
+    for stage, exe, arguments, output in stages:
+        if keep_files and path.exists(output):
+            info(f'found existing {path.basename(output)}; skipping {stage} for {video.labelname}')
+            continue
+        info(f'running {stage} for {video.labelname}')
+        result = await _run([exe, *arguments])
+        if result.returncode != 0:
+            raise IOError(f"{stage} failed on {video.labelname}")
+        info(f"{stage} OK for {video.labelname}")
+        ran.add(stage)
+    info(f"whiskers complete for {video.labelname}")
+    if not path.isfile(video.whiskname) or not path.isfile(video.measname):
+        raise IOError(f"whisker or measurement file was not saved for {video.name}")
+    # only publish outputs this run computed: a preexisting local file may have been
+    # made under other parameters, and must not land in the cache under today's key.
+    if key and 'trace' in ran:
+        cache.store(key, '.whiskers', video.whiskname)
+    if key and ran & {'measure', 'classify', 'reclassify'}:
+        cache.store(key, meas_entry, video.measname)
+    if not (path.isfile(video.summaryfile) and keep_files):
+        whiskraw_fresh = not (path.isfile(video.whiskraw) and keep_files)
+        estimate_whisking_from_raw_whiskers(video, config, keep_files)
+        if key and whiskraw_fresh:
+            cache.store(key, '-whisk-raw.csv', video.whiskraw)
 
 
 def filter_raw(whiskdat: pd.DataFrame, params: Config, name: str) -> pd.DataFrame:
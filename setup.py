@@ -16,6 +16,5 @@ setup(
     description='',
     install_requires=['opencv_python',
                       'pandas',
-                      'progressbar2',
-                      'joblib']
+                      'progressbar2']
 )